@@ -0,0 +1,86 @@
+from sqlalchemy import Column, Integer, SmallInteger, String, Float, Date, ForeignKey, Index, TypeDecorator
+from sqlalchemy.orm import declarative_base, relationship
+from datetime import datetime
+
+# Order status names; STATUS_INDEX maps each name to its stored SMALLINT code
+STATUSES = ("Pending", "Shipped", "Delivered")
+STATUS_INDEX = {status: i for i, status in enumerate(STATUSES)}
+
+Base = declarative_base()
+
+# Stores an order status as its position in STATUSES and loads it back as the name
+class StatusType(TypeDecorator):
+    impl = SmallInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else STATUS_INDEX[value]
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else STATUSES[value]
+
+# Database Models
+class User(Base):
+    __tablename__ = 'Users'
+    user_id = Column(Integer, primary_key=True)
+    name = Column(String)
+    email = Column(String)
+
+class CoffeeBean(Base):
+    __tablename__ = 'CoffeeBeans'
+    bean_id = Column(Integer, primary_key=True)
+    name = Column(String)
+    origin = Column(String)
+    roast_level = Column(String)
+    price_per_gram = Column(Float)
+    stock_quantity = Column(Integer)
+    __table_args__ = (
+        Index("idx_stock_quantity", "stock_quantity"),  # Speeds up queries that filter coffee beans based on their stock.
+    )
+
+class Order(Base):
+    __tablename__ = 'Orders'
+    order_id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('Users.user_id'))
+    total_price = Column(Float)
+    order_date = Column(Date, default=datetime.now)
+    status = Column(StatusType)
+    user = relationship("User", back_populates="orders")
+    __table_args__ = (
+        Index("idx_order_date", "order_date"),  # Optimizes queries that filter or sort orders based on their date.
+        Index("idx_orders_cover", "user_id", order_date.desc(), "status", "total_price"),  # Covers per-user order listings, returned already sorted by date.
+        Index("idx_status", "status"),  # Speeds up queries that filter orders based on their current status.
+    )
+
+User.orders = relationship("Order", back_populates="user")
+
+class OrderItem(Base):
+    __tablename__ = 'OrderItems'
+    item_id = Column(Integer, primary_key=True)
+    order_id = Column(Integer, ForeignKey('Orders.order_id'))
+    bean_id = Column(Integer, ForeignKey('CoffeeBeans.bean_id'))
+    quantity = Column(Integer)
+    price = Column(Float)
+    bean_name = Column(String, index=True)  # Copied from the bean at order time so listings skip the join
+    unit_price = Column(Float)  # Price per gram at order time
+    order = relationship("Order", back_populates="items")
+    bean = relationship("CoffeeBean")
+    __table_args__ = (
+        Index("idx_orderitems_order_id", "order_id", "quantity", "bean_name"),  # Covers the per-order item join that rebuilds OrderSummary rows.
+    )
+
+Order.items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
+
+# One row per order with the values view_orders displays, kept up to date by triggers
+class OrderSummary(Base):
+    __tablename__ = 'OrderSummary'
+    order_id = Column(Integer, primary_key=True)
+    user_name = Column(String)
+    status = Column(String)
+    total_price = Column(Float)
+    order_date = Column(Date)
+    bean_names = Column(String)
+    total_quantity = Column(Integer)
+    __table_args__ = (
+        Index("idx_os_date", order_date.desc()),  # Lets view_orders read the summary already sorted by date.
+    )
@@ -1,150 +1,325 @@
 import streamlit as st
-from sqlalchemy import (
-    create_engine, Column, Integer, String, Float, Date, ForeignKey, text
-)
-from sqlalchemy.orm import sessionmaker, declarative_base, relationship
-from datetime import datetime
+from sqlalchemy import create_engine, event, case, select, insert, update, delete, text
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.orm import sessionmaker
 import pandas as pd
 
-# Database setup with SERIALIZABLE isolation level
-engine = create_engine('sqlite:///caffeinated.db', isolation_level="SERIALIZABLE")
-Session = sessionmaker(bind=engine)
-session = Session()
-Base = declarative_base()
-
-# Database Models
-class User(Base):
-    __tablename__ = 'Users'
-    user_id = Column(Integer, primary_key=True)
-    name = Column(String)
-    email = Column(String)
-
-class CoffeeBean(Base):
-    __tablename__ = 'CoffeeBeans'
-    bean_id = Column(Integer, primary_key=True)
-    name = Column(String)
-    origin = Column(String)
-    roast_level = Column(String)
-    price_per_gram = Column(Float)
-    stock_quantity = Column(Integer)
-
-class Order(Base):
-    __tablename__ = 'Orders'
-    order_id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey('Users.user_id'))
-    total_price = Column(Float)
-    order_date = Column(Date, default=datetime.now)
-    status = Column(String)
-    user = relationship("User", back_populates="orders")
-
-User.orders = relationship("Order", back_populates="user")
-
-class OrderItem(Base):
-    __tablename__ = 'OrderItems'
-    item_id = Column(Integer, primary_key=True)
-    order_id = Column(Integer, ForeignKey('Orders.order_id'))
-    bean_id = Column(Integer, ForeignKey('CoffeeBeans.bean_id'))
-    quantity = Column(Integer)
-    price = Column(Float)
-    order = relationship("Order", back_populates="items")
-    bean = relationship("CoffeeBean")
-
-Order.items = relationship("OrderItem", back_populates="order")
-
-Base.metadata.create_all(engine)
+from models import STATUSES, STATUS_INDEX, Base, User, CoffeeBean, Order, OrderItem, OrderSummary
+
+# Selectbox options with precomputed positions, so widgets look up their index in O(1)
+ROAST_LEVELS = ("Light", "Medium", "Dark")
+ROAST_INDEX = {roast: i for i, roast in enumerate(ROAST_LEVELS)}
+
+# WAL lets readers run alongside a writer and needs fewer fsyncs per commit
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-65536")  # 64 MB page cache
+    cursor.execute("PRAGMA mmap_size=268435456")  # Read pages through a 256 MB memory map
+    cursor.execute("PRAGMA busy_timeout=3000")  # Wait up to 3 s for a competing writer (pysqlite defaults to 5 s)
+    cursor.close()
+    # Write transactions take the write lock at BEGIN, so a reader never has to upgrade mid-transaction
+    dbapi_connection.isolation_level = "IMMEDIATE"
+
+# Database setup with a pooled connection, built once per process; SQLite locking is configured
+# per connection above
+@st.cache_resource
+def get_engine():
+    engine = create_engine(
+        'sqlite:///caffeinated.db',
+        poolclass=QueuePool,
+        pool_size=5,
+        max_overflow=10,
+        pool_pre_ping=True,
+        connect_args={"check_same_thread": False},
+    )
+    event.listen(engine, "connect", set_sqlite_pragmas)
+    return engine
+
+# Session factory; each handler opens a short-lived session so no transaction outlives its write.
+# expire_on_commit=False keeps loaded attributes usable after a commit
+@st.cache_resource
+def get_sessionmaker():
+    return sessionmaker(bind=get_engine(), expire_on_commit=False)
+
+engine = get_engine()
+Session = get_sessionmaker()
+# Add columns introduced after the first release to existing databases
+def migrate_order_items(conn):
+    columns = {row.name for row in conn.execute(text("PRAGMA table_info(OrderItems)"))}
+    if "bean_name" not in columns:
+        conn.execute(text("ALTER TABLE OrderItems ADD COLUMN bean_name VARCHAR"))
+        conn.execute(text("ALTER TABLE OrderItems ADD COLUMN unit_price FLOAT"))
+        conn.execute(text("""
+            UPDATE OrderItems SET
+                bean_name = (SELECT name FROM CoffeeBeans WHERE CoffeeBeans.bean_id = OrderItems.bean_id),
+                unit_price = price / quantity
+        """))
+
+# SQLite has no materialized views, so triggers on Orders and OrderItems rebuild the
+# affected OrderSummary row whenever an order or one of its items changes. The summary keeps
+# the status name, which is what view_orders displays.
+STATUS_NAME_SQL = "CASE Orders.status " + " ".join(f"WHEN {code} THEN '{status}'" for code, status in enumerate(STATUSES)) + " END"
+
+def refresh_order_summary_sql(order_id=None):
+    where = f"WHERE Orders.order_id = {order_id}" if order_id else ""
+    return f"""
+        INSERT OR REPLACE INTO OrderSummary
+            (order_id, user_name, status, total_price, order_date, bean_names, total_quantity)
+        SELECT
+            Orders.order_id,
+            Users.name,
+            {STATUS_NAME_SQL},
+            Orders.total_price,
+            Orders.order_date,
+            group_concat(OrderItems.bean_name, ', '),
+            COALESCE(SUM(OrderItems.quantity), 0)
+        FROM Orders
+        LEFT JOIN Users ON Orders.user_id = Users.user_id
+        LEFT JOIN OrderItems ON Orders.order_id = OrderItems.order_id
+        {where}
+        GROUP BY Orders.order_id;
+    """
+
+ORDER_SUMMARY_TRIGGERS = {
+    "trg_orders_insert": ("AFTER INSERT ON Orders", refresh_order_summary_sql("NEW.order_id")),
+    "trg_orders_update": ("AFTER UPDATE ON Orders", refresh_order_summary_sql("NEW.order_id")),
+    "trg_orders_delete": ("AFTER DELETE ON Orders", "DELETE FROM OrderSummary WHERE order_id = OLD.order_id;"),
+    "trg_order_items_insert": ("AFTER INSERT ON OrderItems", refresh_order_summary_sql("NEW.order_id")),
+    "trg_order_items_update": (
+        "AFTER UPDATE ON OrderItems",
+        refresh_order_summary_sql("OLD.order_id") + refresh_order_summary_sql("NEW.order_id"),
+    ),
+    "trg_order_items_delete": ("AFTER DELETE ON OrderItems", refresh_order_summary_sql("OLD.order_id")),
+}
+
+def create_order_summary_triggers(conn):
+    existing = {row.name for row in conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'trigger'"))}
+    if existing.issuperset(ORDER_SUMMARY_TRIGGERS):
+        return
+    for name, (timing, body) in ORDER_SUMMARY_TRIGGERS.items():
+        conn.execute(text(f"CREATE TRIGGER IF NOT EXISTS {name} {timing} BEGIN {body} END"))
+    # Backfill orders written before the triggers existed
+    conn.execute(text("DELETE FROM OrderSummary"))
+    conn.execute(text(refresh_order_summary_sql()))
+
+# Rebuild Orders with an integer status column; SQLite cannot change a column's type in place.
+# The summary triggers are dropped first, since a rename is refused while a trigger refers to
+# the missing table; migrate_schema recreates them and the Orders indexes afterwards.
+def migrate_order_status(conn):
+    columns = {row.name: row.type for row in conn.execute(text("PRAGMA table_info(Orders)"))}
+    if columns["status"] == "SMALLINT":
+        return
+    for name in ORDER_SUMMARY_TRIGGERS:
+        conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+    conn.exec_driver_sql("DROP TABLE IF EXISTS Orders_new")
+    conn.exec_driver_sql("""
+        CREATE TABLE Orders_new (
+            order_id INTEGER NOT NULL PRIMARY KEY,
+            user_id INTEGER REFERENCES Users (user_id),
+            total_price FLOAT,
+            order_date DATE,
+            status SMALLINT
+        )
+    """)
+    status_codes = " ".join(f"WHEN '{status}' THEN {code}" for status, code in STATUS_INDEX.items())
+    conn.exec_driver_sql(f"""
+        INSERT INTO Orders_new (order_id, user_id, total_price, order_date, status)
+        SELECT order_id, user_id, total_price, order_date, CASE status {status_codes} END FROM Orders
+    """)
+    conn.exec_driver_sql("DROP TABLE Orders")
+    conn.exec_driver_sql("ALTER TABLE Orders_new RENAME TO Orders")
 
 # Indexes for Optimization
-session.execute(text("CREATE INDEX IF NOT EXISTS idx_order_date ON Orders(order_date);")) # Optimizes queries that filter or sort orders based on their date.
-session.execute(text("CREATE INDEX IF NOT EXISTS idx_stock_quantity ON CoffeeBeans(stock_quantity);")) # Speeds up queries that filter coffee beans based on their stock.
-session.execute(text("CREATE INDEX IF NOT EXISTS idx_user_id ON Orders(user_id);")) # Enhances queries that filter orders based on a specific user.
-session.execute(text("CREATE INDEX IF NOT EXISTS idx_status ON Orders(status);")) # Speeds up queries that filter orders based on their current status.
+# Indexes are declared on the models; these older ones were replaced and are dropped on migration
+DROPPED_INDEXES = [
+    "idx_user_id",  # Superseded by idx_orders_cover, which leads with user_id.
+    "idx_orderitems_order",  # Superseded by idx_orderitems_order_id, which adds bean_name.
+]
+
+# Schema Migrations
+# PRAGMA user_version records the schema version a database has been brought up to, so the
+# column, trigger and index DDL runs once per database.
+# Every step is idempotent; bump SCHEMA_VERSION whenever a step is added or changed.
+SCHEMA_VERSION = 3
+
+def migrate_schema(force=False):
+    with engine.connect() as conn:
+        # pysqlite only opens a transaction before DML, so DDL would autocommit one statement
+        # at a time; switch the driver to manual mode and BEGIN explicitly so every step,
+        # including the user_version bump, commits or rolls back together
+        dbapi_connection = conn.connection.dbapi_connection
+        dbapi_connection.isolation_level = None
+        try:
+            with conn.begin():
+                conn.exec_driver_sql("BEGIN IMMEDIATE")
+                if not force and conn.execute(text("PRAGMA user_version")).scalar() >= SCHEMA_VERSION:
+                    return
+                migrate_order_items(conn)
+                migrate_order_status(conn)
+                create_order_summary_triggers(conn)
+                # create_all only builds a model's indexes along with a new table
+                for table in Base.metadata.sorted_tables:
+                    for index in table.indexes:
+                        index.create(conn, checkfirst=True)
+                # Parameterless DDL goes straight to the driver, one statement per call
+                for name in DROPPED_INDEXES:
+                    conn.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
+                conn.execute(text(f"PRAGMA user_version = {SCHEMA_VERSION}"))
+        finally:
+            dbapi_connection.isolation_level = "IMMEDIATE"
+
+# Create missing tables and migrate, once per process
+@st.cache_resource
+def init_database():
+    Base.metadata.create_all(engine)
+    migrate_schema()
+
+init_database()
+
+# Read Queries
+# Core statements take their result types from the models and are reused from SQLAlchemy's
+# compiled cache
+ALL_BEANS_QUERY = select(CoffeeBean.__table__)
+
+# The order tabs only pick an order and edit its status, so no other columns are loaded
+ORDER_STATUS_QUERY = select(Order.order_id, Order.status).order_by(Order.order_id)
+
+# The summary table already holds one precomputed row per order
+ORDER_SUMMARY_QUERY = select(OrderSummary.__table__).order_by(OrderSummary.order_date.desc())
+
+# Cached Reads
+# Reads are shared across reruns and sessions; every write clears the loaders it affects,
+# and the TTL bounds staleness from writes made outside this app.
+@st.cache_data(ttl=60, show_spinner=False)
+def load_beans():
+    return pd.read_sql(ALL_BEANS_QUERY, engine)
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_orders():
+    return pd.read_sql(ORDER_STATUS_QUERY, engine)
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_order_summary():
+    return pd.read_sql_query(ORDER_SUMMARY_QUERY, engine)
 
 # Streamlit UI
 st.set_page_config(page_title="Caffeinated", page_icon="☕", layout="wide")
 st.title("☕ Welcome to Caffeinated Coffee ☕")
 
+# Tab bodies are fragments; after a write refresh_app reruns the whole app and carries the
+# confirmation toast across in session state
+if "toast" in st.session_state:
+    st.toast(st.session_state.pop("toast"))
+
+def refresh_app(message):
+    st.session_state["toast"] = message
+    st.rerun()
+
 # Ensure Default User
 def ensure_user_exists():
-    user = session.query(User).filter_by(user_id=1).first()
-    if not user:
-        new_user = User(user_id=1, name="Default User", email="user@example.com")
-        session.add(new_user)
-        session.commit()
+    # Checked once per browser session
+    if st.session_state.get("_default_user_checked"):
+        return
+    with Session.begin() as session:
+        user = session.get(User, 1)
+        if not user:
+            new_user = User(user_id=1, name="Default User", email="user@example.com")
+            session.add(new_user)
+    st.session_state["_default_user_checked"] = True
+
+# Insert many coffee beans with one executemany INSERT in a single transaction
+BEAN_COLUMNS = ["name", "origin", "roast_level", "price_per_gram", "stock_quantity"]
+
+def bulk_insert_beans(rows):
+    # An empty parameter list would run the INSERT once with no values and store an all-NULL row
+    if not rows:
+        return
+    with Session.begin() as session:
+        session.execute(insert(CoffeeBean), rows)
 
 # Function to load demo coffee beans and orders
 def load_demo_data_and_orders():
+    # Ensure the default user exists
+    ensure_user_exists()
+
     try:
-        # Demo coffee bean data
-        demo_beans = [
-            {"name": "Arabica", "origin": "Brazil", "roast_level": "Medium", "price_per_gram": 0.05, "stock_quantity": 1000},
-            {"name": "Robusta", "origin": "Vietnam", "roast_level": "Dark", "price_per_gram": 0.03, "stock_quantity": 500},
-            {"name": "Blue Mountain", "origin": "Jamaica", "roast_level": "Light", "price_per_gram": 0.10, "stock_quantity": 200},
-            {"name": "Ethiopian Yirgacheffe", "origin": "Ethiopia", "roast_level": "Medium", "price_per_gram": 0.08, "stock_quantity": 300},
-            {"name": "Colombian Supremo", "origin": "Colombia", "roast_level": "Dark", "price_per_gram": 0.07, "stock_quantity": 800},
-        ]
-
-        # Ensure the default user exists
-        ensure_user_exists()
-
-        # Add coffee beans
-        for bean in demo_beans:
-            new_bean = CoffeeBean(**bean)
-            session.add(new_bean)
-        session.flush()  # Flush to generate bean IDs for order creation
-
-        # Fetch all added beans
-        beans = session.query(CoffeeBean).all()
-
-        # Demo order data (order quantities and statuses)
-        demo_orders = [
-            {"bean_id": beans[0].bean_id, "quantity": 50, "status": "Pending"},
-            {"bean_id": beans[1].bean_id, "quantity": 100, "status": "Shipped"},
-            {"bean_id": beans[2].bean_id, "quantity": 25, "status": "Delivered"},
-            {"bean_id": beans[3].bean_id, "quantity": 10, "status": "Pending"},
-            {"bean_id": beans[4].bean_id, "quantity": 75, "status": "Shipped"},
-        ]
-
-        # Add orders and reduce stock
-        for order_data in demo_orders:
-            # Calculate total price
-            bean = session.query(CoffeeBean).filter_by(bean_id=order_data["bean_id"]).first()
-            total_price = bean.price_per_gram * order_data["quantity"]
-
-            # Create a new order
-            new_order = Order(
-                user_id=1,  # Default user
-                total_price=total_price,
-                status=order_data["status"],
+        with Session.begin() as session:
+            # Demo coffee bean data
+            demo_beans = [
+                {"name": "Arabica", "origin": "Brazil", "roast_level": "Medium", "price_per_gram": 0.05, "stock_quantity": 1000},
+                {"name": "Robusta", "origin": "Vietnam", "roast_level": "Dark", "price_per_gram": 0.03, "stock_quantity": 500},
+                {"name": "Blue Mountain", "origin": "Jamaica", "roast_level": "Light", "price_per_gram": 0.10, "stock_quantity": 200},
+                {"name": "Ethiopian Yirgacheffe", "origin": "Ethiopia", "roast_level": "Medium", "price_per_gram": 0.08, "stock_quantity": 300},
+                {"name": "Colombian Supremo", "origin": "Colombia", "roast_level": "Dark", "price_per_gram": 0.07, "stock_quantity": 800},
+            ]
+
+            # Add coffee beans with one executemany INSERT; RETURNING hands back their IDs in input order
+            bean_ids = session.execute(
+                insert(CoffeeBean).returning(CoffeeBean.bean_id, sort_by_parameter_order=True), demo_beans
+            ).scalars().all()
+            beans = dict(zip(bean_ids, demo_beans))
+
+            # Demo order data (order quantities and statuses)
+            demo_orders = [
+                {"bean_id": bean_ids[0], "quantity": 50, "status": "Pending"},
+                {"bean_id": bean_ids[1], "quantity": 100, "status": "Shipped"},
+                {"bean_id": bean_ids[2], "quantity": 25, "status": "Delivered"},
+                {"bean_id": bean_ids[3], "quantity": 10, "status": "Pending"},
+                {"bean_id": bean_ids[4], "quantity": 75, "status": "Shipped"},
+            ]
+
+            # Build order and order item rows from the in-memory bean data
+            orders, order_items = [], []
+            for order_data in demo_orders:
+                bean = beans[order_data["bean_id"]]
+                total_price = bean["price_per_gram"] * order_data["quantity"]
+                orders.append({"user_id": 1, "total_price": total_price, "status": order_data["status"]})  # Default user
+                order_items.append({
+                    "bean_id": order_data["bean_id"],
+                    "quantity": order_data["quantity"],
+                    "price": total_price,
+                    "bean_name": bean["name"],
+                    "unit_price": bean["price_per_gram"],
+                })
+
+            # Add all orders in one batch, then their items in another
+            order_ids = session.execute(
+                insert(Order).returning(Order.order_id, sort_by_parameter_order=True), orders
+            ).scalars().all()
+            for order_item, order_id in zip(order_items, order_ids):
+                order_item["order_id"] = order_id
+            session.execute(insert(OrderItem), order_items)
+
+            # Reduce stock for every ordered bean in one UPDATE, with a CASE picking each bean's total
+            ordered = {}
+            for order_data in demo_orders:
+                ordered[order_data["bean_id"]] = ordered.get(order_data["bean_id"], 0) + order_data["quantity"]
+            session.execute(
+                update(CoffeeBean)
+                .where(CoffeeBean.bean_id.in_(ordered))
+                .values(stock_quantity=CoffeeBean.stock_quantity - case(ordered, value=CoffeeBean.bean_id))
             )
-            session.add(new_order)
-            session.flush()  # Get the order ID for the order item
-
-            # Create an order item
-            new_order_item = OrderItem(
-                order_id=new_order.order_id,
-                bean_id=bean.bean_id,
-                quantity=order_data["quantity"],
-                price=total_price,
-            )
-            session.add(new_order_item)
-
-            # Update bean stock
-            bean.stock_quantity -= order_data["quantity"]
-
-        session.commit()
-        st.success("Demo coffee beans and orders loaded successfully!")
-        st.rerun()
+        load_beans.clear()
+        load_orders.clear()
+        load_order_summary.clear()
+        st.toast("Demo coffee beans and orders loaded successfully!")
     except Exception as e:
-        session.rollback()
         st.error(f"Error loading demo data and orders: {e}")
 
 # Reset Data
 def reset_all_data():
     Base.metadata.drop_all(engine)
     Base.metadata.create_all(engine)
+    migrate_schema(force=True)  # The dropped tables took their triggers and indexes with them
+    st.session_state.pop("_default_user_checked", None)
     ensure_user_exists()
-    st.rerun()
-    st.success("Database reset completed!")
+    load_beans.clear()
+    load_orders.clear()
+    load_order_summary.clear()
+    st.toast("Database reset completed!")
 
 # Sidebar with Reset and Demo Data Buttons
 with st.sidebar:
@@ -156,311 +331,367 @@ with st.sidebar:
 
 
 # Add Coffee Bean
+@st.fragment
 def add_coffee_bean():
     st.header("Add a New Coffee Bean")
     name = st.text_input("Bean Name")
     origin = st.text_input("Origin")
-    roast_level = st.selectbox("Roast Level", ["Light", "Medium", "Dark"])
+    roast_level = st.selectbox("Roast Level", ROAST_LEVELS)
     price_per_gram = st.number_input("Price per Gram ($)", min_value=0.01, step=0.01)
     stock_quantity = st.number_input("Stock Quantity (grams)", min_value=1, step=1)
 
     if st.button("Add Coffee Bean"):
         try:
-            new_bean = CoffeeBean(
-                name=name, origin=origin, roast_level=roast_level,
-                price_per_gram=price_per_gram, stock_quantity=stock_quantity
-            )
-            session.add(new_bean)
-            session.commit()
-            st.success(f"Coffee bean '{name}' added!")
-            st.rerun()
+            with Session.begin() as session:
+                new_bean = CoffeeBean(
+                    name=name, origin=origin, roast_level=roast_level,
+                    price_per_gram=price_per_gram, stock_quantity=stock_quantity
+                )
+                session.add(new_bean)
+            load_beans.clear()
+            refresh_app(f"Coffee bean '{name}' added!")
         except Exception as e:
-            session.rollback()
             st.error(f"Error adding coffee bean: {e}")
 
+    # Import many beans at once from a CSV with one column per bean field
+    uploaded_file = st.file_uploader(f"Import Coffee Beans from CSV ({', '.join(BEAN_COLUMNS)})", type="csv")
+    if uploaded_file is not None and st.button("Import Coffee Beans"):
+        try:
+            beans_df = pd.read_csv(uploaded_file, usecols=BEAN_COLUMNS)
+            price = pd.to_numeric(beans_df["price_per_gram"], errors="coerce")
+            stock = pd.to_numeric(beans_df["stock_quantity"], errors="coerce")
+            # Hold each row to the same rules as the form: every field set, a known roast,
+            # a positive price and a whole stock of at least one gram
+            invalid = (
+                beans_df.isna().any(axis=1)
+                | ~beans_df["roast_level"].isin(ROAST_LEVELS)
+                | ~(price > 0)
+                | ~((stock >= 1) & (stock % 1 == 0))
+            )
+            if beans_df.empty:
+                st.error("Import rejected: the CSV has no coffee bean rows.")
+            elif invalid.any():
+                lines = ", ".join(str(line) for line in beans_df.index[invalid] + 2)
+                st.error(f"Import rejected: invalid or missing values on CSV line(s) {lines}.")
+            else:
+                rows = pd.DataFrame({
+                    "name": beans_df["name"].astype(str),
+                    "origin": beans_df["origin"].astype(str),
+                    "roast_level": beans_df["roast_level"].astype(str),
+                    "price_per_gram": price.astype(float),
+                    "stock_quantity": stock.astype(int),
+                }).to_dict("records")
+                bulk_insert_beans(rows)
+                load_beans.clear()
+                refresh_app(f"Imported {len(rows)} coffee bean(s)!")
+        except Exception as e:
+            st.error(f"Error importing coffee beans: {e}")
+
 # Update Coffee Bean
+@st.fragment
 def update_coffee_bean():
     st.header("Update Coffee Bean Details")
-    beans = session.query(CoffeeBean).all()
-    if beans:
-        bean_names = [bean.name for bean in beans]
-        selected_bean_name = st.selectbox("Select Coffee Bean", bean_names, key="update_coffee_bean_select")
-
-        selected_bean = session.query(CoffeeBean).filter_by(name=selected_bean_name).first()
-        if selected_bean:
-            new_name = st.text_input("New Name", value=selected_bean.name)
-            new_origin = st.text_input("New Origin", value=selected_bean.origin)
-            new_roast_level = st.selectbox("New Roast Level", ["Light", "Medium", "Dark"], index=["Light", "Medium", "Dark"].index(selected_bean.roast_level))
-            new_price = st.number_input("New Price per Gram ($)", min_value=0.01, value=selected_bean.price_per_gram)
-            new_stock = st.number_input("New Stock Quantity", min_value=0, value=selected_bean.stock_quantity)
-
-            if st.button("Update Coffee Bean"):
-                try:
-                    selected_bean.name = new_name
-                    selected_bean.origin = new_origin
-                    selected_bean.roast_level = new_roast_level
-                    selected_bean.price_per_gram = new_price
-                    selected_bean.stock_quantity = new_stock
-                    session.commit()
-                    st.success(f"Coffee bean '{new_name}' updated!")
-                    st.rerun()
-                except Exception as e:
-                    session.rollback()
-                    st.error(f"Error updating coffee bean: {e}")
+    beans = load_beans()
+    if not beans.empty:
+        # Plain dict rows from the cached frame; no ORM objects are needed to fill the form
+        beans_by_id = {bean["bean_id"]: bean for bean in beans.to_dict("records")}
+        selected_bean_id = st.selectbox(
+            "Select Coffee Bean", list(beans_by_id), format_func=lambda bean_id: beans_by_id[bean_id]["name"],
+            key="update_coffee_bean_select"
+        )
+
+        selected_bean = beans_by_id[selected_bean_id]
+        new_name = st.text_input("New Name", value=selected_bean["name"])
+        new_origin = st.text_input("New Origin", value=selected_bean["origin"])
+        new_roast_level = st.selectbox("New Roast Level", ROAST_LEVELS, index=ROAST_INDEX[selected_bean["roast_level"]])
+        new_price = st.number_input("New Price per Gram ($)", min_value=0.01, value=selected_bean["price_per_gram"])
+        new_stock = st.number_input("New Stock Quantity", min_value=0, value=selected_bean["stock_quantity"])
+
+        if st.button("Update Coffee Bean"):
+            try:
+                with Session.begin() as session:
+                    session.execute(
+                        update(CoffeeBean)
+                        .where(CoffeeBean.bean_id == selected_bean_id)
+                        .values(
+                            name=new_name, origin=new_origin, roast_level=new_roast_level,
+                            price_per_gram=new_price, stock_quantity=new_stock
+                        )
+                    )
+                load_beans.clear()
+                refresh_app(f"Coffee bean '{new_name}' updated!")
+            except Exception as e:
+                st.error(f"Error updating coffee bean: {e}")
 
 # Delete Coffee Bean
+@st.fragment
 def delete_coffee_bean():
     st.header("Delete a Coffee Bean")
-    beans = session.query(CoffeeBean).all()
-    if beans:
-        bean_names = [bean.name for bean in beans]
-        selected_bean_name = st.selectbox("Select Coffee Bean", bean_names, key="delete_coffee_bean_select")
+    beans = load_beans()
+    if not beans.empty:
+        bean_names = dict(zip(beans["bean_id"].tolist(), beans["name"].tolist()))
+        selected_bean_id = st.selectbox(
+            "Select Coffee Bean", list(bean_names), format_func=bean_names.get, key="delete_coffee_bean_select"
+        )
 
         if st.button("Delete Coffee Bean"):
             try:
-                selected_bean = session.query(CoffeeBean).filter_by(name=selected_bean_name).first()
-                session.delete(selected_bean)
-                session.commit()
-                st.success(f"Coffee bean '{selected_bean_name}' deleted!")
-                st.rerun()
+                with Session.begin() as session:
+                    # Delete by primary key directly; nothing cascades from a bean, so no object is needed
+                    session.execute(delete(CoffeeBean).where(CoffeeBean.bean_id == selected_bean_id))
+                load_beans.clear()
+                refresh_app(f"Coffee bean '{bean_names[selected_bean_id]}' deleted!")
             except Exception as e:
-                session.rollback()
                 st.error(f"Error deleting coffee bean: {e}")
 
 # View Available Coffee Beans
 def view_available_beans():
     st.header("Available Coffee Beans")
     
-    # Query to fetch available beans with their stock
-    available_beans_query = text("""
-        SELECT name, origin, roast_level, price_per_gram, stock_quantity
-        FROM CoffeeBeans
-        WHERE stock_quantity > 0
-        ORDER BY stock_quantity DESC;
-    """)
-    available_beans = session.execute(available_beans_query).fetchall()
+    # Filtered from the cached bean list, so this tab issues no query of its own
+    beans = load_beans()
+    beans_df = (
+        beans.loc[beans["stock_quantity"] > 0, ["name", "origin", "roast_level", "price_per_gram", "stock_quantity"]]
+        .sort_values("stock_quantity", ascending=False)
+    )
     
-    # Display the beans in a table
-    if available_beans:
-        st.table([{
-            "Name": bean.name,
-            "Origin": bean.origin,
-            "Roast Level": bean.roast_level,
-            "Price per Gram": f"${bean.price_per_gram:.2f}",
-            "Stock Quantity": f"{bean.stock_quantity} grams"
-        } for bean in available_beans])
+    # Display the beans in a table; the column config formats price and stock
+    if not beans_df.empty:
+        beans_df = beans_df.rename(columns={
+            "name": "Name",
+            "origin": "Origin",
+            "roast_level": "Roast Level",
+            "price_per_gram": "Price per Gram",
+            "stock_quantity": "Stock Quantity"
+        })
+        st.dataframe(
+            beans_df,
+            hide_index=True,
+            column_config={
+                "Price per Gram": st.column_config.NumberColumn(format="$%.2f"),
+                "Stock Quantity": st.column_config.NumberColumn(format="%d grams"),
+            }
+        )
     else:
         st.write("No coffee beans are currently available in stock.")
 
 # Place Order
+@st.fragment
 def place_order():
     st.header("Place an Order")
     ensure_user_exists()
 
     # Fetch all coffee beans
-    beans = session.query(CoffeeBean).all()
-
-    if beans:
-        # Create a list of available coffee bean names
-        bean_names = [bean.name for bean in beans]
-        selected_bean_name = st.selectbox("Choose Coffee Bean", options=bean_names)
-
-        # Fetch the selected bean's details
-        selected_bean = session.query(CoffeeBean).filter_by(name=selected_bean_name).first()
-
-        if selected_bean:
-            # Display bean details
-            st.write(f"**Origin**: {selected_bean.origin}")
-            st.write(f"**Roast Level**: {selected_bean.roast_level}")
-            st.write(f"**Price per Gram**: ${selected_bean.price_per_gram:.2f}")
-            st.write(f"**Available Stock**: {selected_bean.stock_quantity} grams")
-
-            # Ensure stock is greater than 0 before allowing order placement
-            if selected_bean.stock_quantity > 0:
-                # Input for quantity
-                max_quantity = selected_bean.stock_quantity  # Max quantity for the order
-                quantity = st.number_input(
-                    f"Select quantity for {selected_bean.name}",
-                    min_value=1,
-                    max_value=max_quantity, 
-                    step=1
-                )
+    beans = load_beans()
+
+    if not beans.empty:
+        # Plain dict rows from the cached frame; the selectbox returns the ID and shows the name
+        beans_by_id = {bean["bean_id"]: bean for bean in beans.to_dict("records")}
+        selected_bean_id = st.selectbox(
+            "Choose Coffee Bean", options=list(beans_by_id), format_func=lambda bean_id: beans_by_id[bean_id]["name"]
+        )
+        selected_bean = beans_by_id[selected_bean_id]
+
+        # Display bean details
+        st.write(f"**Origin**: {selected_bean['origin']}")
+        st.write(f"**Roast Level**: {selected_bean['roast_level']}")
+        st.write(f"**Price per Gram**: ${selected_bean['price_per_gram']:.2f}")
+        st.write(f"**Available Stock**: {selected_bean['stock_quantity']} grams")
+
+        # Ensure stock is greater than 0 before allowing order placement
+        if selected_bean["stock_quantity"] > 0:
+            # Input for quantity
+            max_quantity = selected_bean["stock_quantity"]  # Max quantity for the order
+            quantity = st.number_input(
+                f"Select quantity for {selected_bean['name']}",
+                min_value=1,
+                max_value=max_quantity, 
+                step=1
+            )
 
-                # Button to place the order
-                if st.button("Place Order"):
-                    total_price = selected_bean.price_per_gram * quantity
-
-                    try:
-                        # use of transaction for placing order
-                        with session.begin_nested():
-                            # Check stock before proceeding
-                            if selected_bean.stock_quantity < quantity:
-                                st.error("Insufficient stock for this coffee bean.")
-                                return
-
-                            # Update stock and create order
-                            selected_bean.stock_quantity -= quantity
-                            new_order = Order(
-                                user_id=1,
-                                total_price=total_price,
-                                status="Pending"
-                            )
-                            session.add(new_order)
-                            session.flush()  # Ensure new_order.order_id is generated
+            # Button to place the order
+            if st.button("Place Order"):
+                total_price = selected_bean["price_per_gram"] * quantity
 
-                            order_item = OrderItem(
-                                order_id=new_order.order_id,
-                                bean_id=selected_bean.bean_id,
+                try:
+                    with Session.begin() as session:
+                        # Check and decrement stock in one atomic UPDATE; no row back means not enough stock
+                        remaining_stock = session.execute(
+                            update(CoffeeBean)
+                            .where(CoffeeBean.bean_id == selected_bean["bean_id"], CoffeeBean.stock_quantity >= quantity)
+                            .values(stock_quantity=CoffeeBean.stock_quantity - quantity)
+                            .returning(CoffeeBean.stock_quantity)
+                        ).scalar_one_or_none()
+                        if remaining_stock is None:
+                            # The cached stock was stale; reload it so the form shows the real figure
+                            load_beans.clear()
+                            st.error("Insufficient stock for this coffee bean.")
+                            return
+
+                        # Create order; RETURNING hands back the new order_id without a separate flush
+                        order_id = session.execute(
+                            insert(Order)
+                            .values(user_id=1, total_price=total_price, status="Pending")
+                            .returning(Order.order_id)
+                        ).scalar_one()
+
+                        session.execute(
+                            insert(OrderItem).values(
+                                order_id=order_id,
+                                bean_id=selected_bean["bean_id"],
                                 quantity=quantity,
-                                price=total_price
+                                price=total_price,
+                                bean_name=selected_bean["name"],
+                                unit_price=selected_bean["price_per_gram"]
                             )
-                            session.add(order_item)
-
-                        # Commit the transaction
-                        session.commit()
-                        st.success(f"Order placed for {quantity} grams of {selected_bean.name}! Remaining stock: {selected_bean.stock_quantity} grams.")
-                        st.rerun()
-                    except Exception as e:
-                        # Roll back in case of error
-                        session.rollback()
-                        st.error(f"Error placing order: {str(e)}")
-            else:
-                st.write("The selected coffee bean is out of stock.")
+                        )
+                    # Leaving the block commits the order, its item and the stock decrement together
+                    load_beans.clear()
+                    load_orders.clear()
+                    load_order_summary.clear()
+                    refresh_app(f"Order placed for {quantity} grams of {selected_bean['name']}! Remaining stock: {remaining_stock} grams.")
+                except Exception as e:
+                    st.error(f"Error placing order: {str(e)}")
+        else:
+            st.write("The selected coffee bean is out of stock.")
     else:
         st.write("No coffee beans available for ordering.")
 
 # Delete Order
+@st.fragment
 def delete_order():
     st.header("Delete an Order")
-    orders = session.query(Order).all()
-    if orders:
-        order_ids = [order.order_id for order in orders]
+    orders = load_orders()
+    if not orders.empty:
+        order_ids = orders["order_id"].tolist()
         selected_order_id = st.selectbox("Select Order ID", order_ids)
 
         if st.button("Delete Order"):
             try:
-                order_to_delete = session.query(Order).filter_by(order_id=selected_order_id).first()
-                session.delete(order_to_delete)
-                session.commit()
-                st.success(f"Order ID '{selected_order_id}' deleted!")
+                with Session.begin() as session:
+                    # Delete the items and then the order with one statement each, in one transaction;
+                    # nothing is loaded, so there is no session state to synchronize
+                    session.execute(
+                        delete(OrderItem).where(OrderItem.order_id == selected_order_id),
+                        execution_options={"synchronize_session": False}
+                    )
+                    session.execute(
+                        delete(Order).where(Order.order_id == selected_order_id),
+                        execution_options={"synchronize_session": False}
+                    )
+                load_orders.clear()
+                load_order_summary.clear()
+                refresh_app(f"Order ID '{selected_order_id}' deleted!")
             except Exception as e:
-                session.rollback()
                 st.error(f"Error deleting order: {e}")
 
 # View All Orders with Bean Details
 def view_orders():
     st.header("All Orders with Coffee Bean Details")
 
-    # Query to fetch orders with user, bean, and order details
-    orders_query = text("""
-        SELECT 
-            Orders.order_id,
-            Users.name AS user_name,
-            Orders.status,
-            Orders.total_price,
-            Orders.order_date,
-            CoffeeBeans.name AS bean_name,
-            CoffeeBeans.origin,
-            CoffeeBeans.roast_level,
-            OrderItems.quantity
-        FROM Orders
-        JOIN Users ON Orders.user_id = Users.user_id
-        JOIN OrderItems ON Orders.order_id = OrderItems.order_id
-        JOIN CoffeeBeans ON OrderItems.bean_id = CoffeeBeans.bean_id
-        ORDER BY Orders.order_date DESC
-    """)
-    orders = session.execute(orders_query).fetchall()
-
-    # List to store the final data
-    orders_data = []
-
-    for order in orders:
-        orders_data.append({
-            "Order ID": order.order_id,
-            "User": order.user_name,
-            "Status": order.status,
-            "Total Price": f"${order.total_price:.2f}",
-            "Order Date": order.order_date.strftime("%Y-%m-%d") if isinstance(order.order_date, datetime) else order.order_date,
-            "Bean Name": order.bean_name,
-            "Origin": order.origin,
-            "Roast Level": order.roast_level,
-            "Quantity (grams)": order.quantity
+    orders_df = load_order_summary()
+
+    if not orders_df.empty:
+        # Rename columns for display; the column config formats price and date
+        orders_df = orders_df.rename(columns={
+            "order_id": "Order ID",
+            "user_name": "User",
+            "status": "Status",
+            "total_price": "Total Price",
+            "order_date": "Order Date",
+            "bean_names": "Bean Name",
+            "total_quantity": "Quantity (grams)"
         })
-
-    if orders_data:
-        orders_df = pd.DataFrame(orders_data)
-        st.dataframe(orders_df, hide_index=True)
+        st.dataframe(
+            orders_df,
+            hide_index=True,
+            column_config={
+                "Total Price": st.column_config.NumberColumn(format="$%.2f"),
+                "Order Date": st.column_config.DateColumn(format="YYYY-MM-DD"),
+            }
+        )
     else:
         st.write("No orders available.")
 
 # Change Status of an Order
+@st.fragment
 def update_order_status():
     st.header("Update Order Status")
 
     # Fetch all orders from the database
-    orders = session.query(Order).all()
-
-    if orders:
-        for order in orders:
-            st.write(f"Order ID: {order.order_id} - Current Status: {order.status}")
-
-            # Dropdown to select the new status
-            new_status = st.selectbox(
-                f"Update Status for Order {order.order_id}",
-                ["Pending", "Shipped", "Delivered"],
-                index=["Pending", "Shipped", "Delivered"].index(order.status),
-                key=f"status_{order.order_id}"
-            )
+    orders = load_orders()
+
+    if not orders.empty:
+        # Edit every order's status in one grid
+        edited_orders = st.data_editor(
+            orders,
+            column_config={
+                "order_id": st.column_config.NumberColumn("Order ID", disabled=True),
+                "status": st.column_config.SelectboxColumn("Status", options=STATUSES, required=True),
+            },
+            hide_index=True,
+            key="update_order_status_editor"
+        )
+
+        # Button to apply all status changes at once
+        if st.button("Update Status"):
+            changed = edited_orders[edited_orders["status"] != orders["status"]]
+            if changed.empty:
+                st.info("No changes made.")
+            else:
+                try:
+                    with Session.begin() as session:
+                        # ORM bulk UPDATE by primary key: one executemany for every changed row
+                        session.execute(update(Order), changed.to_dict("records"))
+                    load_orders.clear()
+                    load_order_summary.clear()
+                    refresh_app(f"Updated status for {len(changed)} order(s).")
+                except Exception as e:
+                    st.error(f"Error updating order status: {str(e)}")
 
-            # Button to apply the status update
-            if st.button(f"Update Status", key=f"update_status_{order.order_id}"):
+        # Set one status on many orders with a single UPDATE ... WHERE order_id IN (...)
+        st.subheader("Update Several Orders")
+        selected_order_ids = st.multiselect("Select Orders", orders["order_id"].tolist(), key="bulk_status_orders")
+        new_status = st.selectbox("New Status", STATUSES, key="bulk_status_value")
+        if st.button("Apply to Selected Orders"):
+            if not selected_order_ids:
+                st.info("No orders selected.")
+            else:
                 try:
-                    # Fetch the order again to ensure consistency
-                    order_to_update = session.query(Order).filter_by(order_id=order.order_id).first()
-
-                    # Only update if the status has changed
-                    if order_to_update and new_status != order_to_update.status:
-                        order_to_update.status = new_status
-                        session.commit()  # Commit the transaction
-                        st.success(f"Updated status for Order {order.order_id} to {new_status}")
-                        st.rerun()  # Refresh the UI to reflect changes
-                    else:
-                        st.info(f"No changes made for Order {order.order_id}.")
+                    with Session.begin() as session:
+                        session.execute(
+                            update(Order).where(Order.order_id.in_(selected_order_ids)).values(status=new_status),
+                            execution_options={"synchronize_session": False}
+                        )
+                    load_orders.clear()
+                    load_order_summary.clear()
+                    refresh_app(f"Set {len(selected_order_ids)} order(s) to {new_status}.")
                 except Exception as e:
-                    session.rollback()  # Roll back the transaction in case of errors
                     st.error(f"Error updating order status: {str(e)}")
     else:
         st.write("No orders available to update.")
 
 # Tabs for Layout
-tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8 = st.tabs([
-    "Add Coffee Bean", "Update Coffee Bean", "Delete Coffee Bean", "View available beans",
-    "Place Order", "Delete Order", "View Orders", "Change Status"
-])
-
-with tab1:
-    add_coffee_bean()
-with tab2:
-    update_coffee_bean()
-with tab3:
-    delete_coffee_bean()
-with tab4:
-    view_available_beans()
-with tab5:
-    place_order()
-with tab6:
-    delete_order()
-with tab7:
-    view_orders()
-with tab8:
-    update_order_status()
+# Selecting a tab reruns the app; only the open tab's section runs
+TABS = {
+    "Add Coffee Bean": add_coffee_bean,
+    "Update Coffee Bean": update_coffee_bean,
+    "Delete Coffee Bean": delete_coffee_bean,
+    "View available beans": view_available_beans,
+    "Place Order": place_order,
+    "Delete Order": delete_order,
+    "View Orders": view_orders,
+    "Change Status": update_order_status,
+}
+
+for tab, render_section in zip(st.tabs(list(TABS), key="active_tab", on_change="rerun"), TABS.values()):
+    if tab.open:
+        with tab:
+            render_section()
 
 # Ensure default user exists on startup
 ensure_user_exists()
 
-# Close database session
-session.close()
-
 # Footer
 st.markdown(
     """